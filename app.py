@@ -1,26 +1,223 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+import orjson
 import os
-import json
+import hmac
+import hashlib
+import functools
 import logging
+import atexit
+from logging.handlers import QueueHandler, QueueListener
+from binance import ThreadedWebsocketManager
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import re
+import queue
+import heapq
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging - records are handed to a queue and written by a listener
+# thread, so log I/O never blocks a webhook response
+_log_queue = queue.SimpleQueue()
+logging.basicConfig(
+    level=logging.INFO,
+    format=logging.BASIC_FORMAT,
+    handlers=[QueueHandler(_log_queue)]
+)
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, for any JSON Flask handles itself"""
+
+    def dumps(self, obj, **kwargs):
+        # Dates go through Flask's default hook (HTTP date format) like Decimal
+        # and __html__; keys are sorted and non-str keys allowed as with the
+        # stdlib provider. Non-ASCII text is written as UTF-8, not \u escapes.
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2  # Flask only asks for indent=2 (debug responses)
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+def _json(body, status=200):
+    """JSON response serialized straight to bytes with orjson"""
+    return Response(orjson.dumps(body), status=status, mimetype='application/json')
 
 # Binance API credentials from environment variables
 BINANCE_API_KEY = os.getenv('BINANCE_API_KEY')
 BINANCE_SECRET_KEY = os.getenv('BINANCE_SECRET_KEY')
 WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', 'my_secret_123')
+# Opt-in: reject alerts that carry no X-Signature, or no secret at all (X-Webhook-Secret
+# header, ?secret= or "secret" in a JSON body - text alerts can only use ?secret=).
+# Off by default, so senders that supply none are still accepted.
+REQUIRE_WEBHOOK_SIGNATURE = os.getenv('REQUIRE_WEBHOOK_SIGNATURE', '').lower() in ('1', 'true', 'yes')
+REQUIRE_WEBHOOK_SECRET = os.getenv('REQUIRE_WEBHOOK_SECRET', '').lower() in ('1', 'true', 'yes')
+_WEBHOOK_KEY = WEBHOOK_SECRET.encode('utf-8')
+_SIGNATURE_MAC = hmac.new(_WEBHOOK_KEY, digestmod=hashlib.sha256)
+# '"secret": "..."' near the start of a JSON body (escaped values are left to the full parse)
+_BODY_SECRET_RE = re.compile(rb'"secret"\s*:\s*"([^"\\]*)"')
+BODY_SECRET_PEEK_BYTES = 128
+# '' = api.binance.com, '1'-'4' pins the client to api1-api4.binance.com
+BINANCE_BASE_ENDPOINT = os.getenv('BINANCE_BASE_ENDPOINT', '')
 
 # Trading settings
 RISK_PERCENTAGE = float(os.getenv('RISK_PERCENTAGE', '5.0'))  # % av saldo per trade
 MIN_USDT_BALANCE = float(os.getenv('MIN_USDT_BALANCE', '10.0'))  # Minsta balans att behålla
+MIN_TRADE_USDT = 10.0  # Binance minimum is usually around $10
+# ACK returns as soon as the order is accepted instead of waiting for fill details
+ORDER_RESP_TYPE = os.getenv('ORDER_RESP_TYPE', 'ACK')
+_RISK_FRACTION = RISK_PERCENTAGE * 0.01
+
+# Symbols whose metadata and prices are fetched at startup
+WARM_SYMBOLS = [s.strip().upper() for s in os.getenv('WARM_SYMBOLS', 'BTCUSDT').split(',') if s.strip()]
+
+# Webhook body limits - real alerts are well under these
+MAX_WEBHOOK_BYTES = 4096
+MAX_TEXT_ALERT_BYTES = 256
+# Werkzeug rejects a larger Content-Length with 413, but silently cuts chunked
+# bodies (no Content-Length) off at this size - webhook() rejects those itself
+app.config['MAX_CONTENT_LENGTH'] = MAX_WEBHOOK_BYTES
+
+# Signals are executed by a background worker; the webhook only enqueues
+TRADE_QUEUE_SIZE = 64
+# signal key -> job, to answer TradingView retries. This is the only retry
+# protection and it lives in this process - gunicorn.conf.py runs one worker
+SEEN_ALERTS_SIZE = 1024
+_TRADE_QUEUE = queue.Queue(maxsize=TRADE_QUEUE_SIZE)
+
+# Consecutive identical (action, symbol) signals arriving within this window
+# become one order; the window only applies while a burst is queued
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW_MS', '250')) / 1000  # 0 disables
+COALESCE_MAX_SIGNALS = 5  # flush early once this many identical signals are waiting
+_SEEN_ALERTS = OrderedDict()
+_SEEN_ALERTS_LOCK = threading.Lock()
+_LOOKUP_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='lookup')
+
+# Per-symbol filter cache:
+#   symbol -> (step_size as Decimal, min market notional, filters by type, fetched_at)
+SYMBOL_META_TTL = 3600  # seconds
+DEFAULT_STEP_SIZE = Decimal('0.000001')  # Used when a symbol has no LOT_SIZE filter
+_SYMBOL_META = {}
+
+# Base/quote assets per symbol from exchangeInfo, refreshed daily
+SYMBOL_ASSETS_TTL = 86400  # seconds
+SYMBOL_ASSETS_RETRY = 60  # min seconds between refreshes triggered by unknown symbols
+_SYMBOL_ASSETS = {}
+_symbol_assets_fetched_at = 0.0
+
+# Live balances from the user-data stream: asset -> (free, locked, received_at)
+BALANCE_MAX_AGE = 30.0  # seconds; older balances are re-fetched over REST
+_BALANCES = {}
+_twm = None
+# Streams by name ('user' or a bookTicker symbol) -> python-binance stream path
+_STREAMS = {}
+_STREAMS_LOCK = threading.Lock()
+ZERO_BALANCE = '0.00000000'
+
+# /balance serves at most this many assets (override with ?limit=N) from an
+# account snapshot reused for ACCOUNT_SNAPSHOT_TTL seconds
+BALANCE_DEFAULT_LIMIT = 50
+BALANCE_MAX_LIMIT = 500  # Larger ?limit values are clamped to this
+ACCOUNT_SNAPSHOT_TTL = 2.0
+_account_snapshot = {'account': None, 'ts': 0.0}
+
+# Best bid/ask from bookTicker streams: symbol -> (bid, ask, received_at)
+PRICE_MAX_AGE = 5.0  # seconds; older quotes are re-fetched over REST
+_PRICES = {}
+
+# Binance REST budgets: 6000 request weight per minute per IP, and orders per second
+REQUEST_WEIGHT_PER_MINUTE = int(os.getenv('BINANCE_WEIGHT_PER_MINUTE', '6000'))
+ORDERS_PER_SECOND = 10
+# Request weight of the endpoints the bot calls
+WEIGHT_PING = 1
+WEIGHT_ACCOUNT = 20  # get_account / get_asset_balance
+WEIGHT_EXCHANGE_INFO = 20  # get_exchange_info / get_symbol_info
+WEIGHT_BOOK_TICKER = 2
+WEIGHT_ALL_BOOK_TICKERS = 4
+WEIGHT_ORDER = 1
+# Pause after a 429/418 that comes without Retry-After - the weight window is one minute
+RATE_LIMIT_BACKOFF = 60
+
+class WeightLimiter:
+    """Thread-safe token bucket; acquire() blocks until the budget allows a call"""
+
+    def __init__(self, capacity, per_seconds):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.resume_at = 0.0  # monotonic time before which nothing may be sent
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cost):
+        while True:
+            with self.lock:
+                wait = self.resume_at - time.monotonic()
+                if wait <= 0:
+                    self._refill()
+                    if self.tokens >= cost:
+                        self.tokens -= cost
+                        return
+                    wait = (cost - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Block every acquire() for the next `seconds`"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def sync_used(self, used):
+        """Never allow more than the server says is left in its window"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, self.capacity - used)
+
+_WEIGHT_LIMITER = WeightLimiter(REQUEST_WEIGHT_PER_MINUTE, 60)
+_ORDER_LIMITER = WeightLimiter(ORDERS_PER_SECOND, 1)
+
+def binance_call(weight, method, *args, **kwargs):
+    """Call a Binance REST method once the request-weight budget allows it"""
+    _WEIGHT_LIMITER.acquire(weight)
+    try:
+        return method(*args, **kwargs)
+    except BinanceAPIException as e:
+        if e.status_code in (418, 429):
+            # Rate limited (429) or IP-banned (418): Binance says how long to stay away,
+            # and lengthens repeat bans itself
+            retry_after = e.response.headers.get('Retry-After') if e.response is not None else None
+            seconds = int(retry_after) if retry_after and retry_after.isdigit() else RATE_LIMIT_BACKOFF
+            logger.warning("⚠️ Binance rate limit hit (%s), pausing REST calls for %ss", e.status_code, seconds)
+            _WEIGHT_LIMITER.pause(seconds)
+        raise
+
+def _sync_used_weight(response, *args, **kwargs):
+    """requests response hook: re-sync with the weight Binance reports for this IP"""
+    # Runs on the thread that made the call, so the header belongs to that call
+    used = response.headers.get('x-mbx-used-weight-1m')
+    if used is not None:
+        _WEIGHT_LIMITER.sync_used(int(used))
 
 # Initialize Binance client with better error handling
 if BINANCE_API_KEY and BINANCE_SECRET_KEY:
@@ -32,10 +229,25 @@ if BINANCE_API_KEY and BINANCE_SECRET_KEY:
         # Log key info (first/last 4 chars only for security)
         logger.info(f"API Key starts with: {clean_api_key[:4]}...{clean_api_key[-4:]}")
         
-        binance_client = Client(clean_api_key, clean_secret_key, testnet=False)
-        
-        # Test connection
-        binance_client.ping()
+        binance_client = Client(
+            clean_api_key,
+            clean_secret_key,
+            base_endpoint=BINANCE_BASE_ENDPOINT,
+            testnet=False
+        )
+        
+        # Pooled keep-alive connections so trades reuse a warm TLS session;
+        # retries only cover connection setup (urllib3 never retries POSTs on read errors)
+        binance_client.session.mount('https://', HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=64,
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        ))
+        binance_client.session.headers['Connection'] = 'keep-alive'
+        binance_client.session.hooks['response'].append(_sync_used_weight)
+        
+        # Test connection (also warms up the pooled connection)
+        binance_call(WEIGHT_PING, binance_client.ping)
         logger.info("✅ Binance client initialized and connected successfully!")
         
     except Exception as e:
@@ -45,17 +257,10 @@ else:
     binance_client = None
     logger.warning("⚠️ Binance API keys not configured!")
 
-@app.route('/')
-def home():
-    # Test Binance connection status
-    binance_status = "❌ Not connected"
-    if binance_client:
-        try:
-            binance_client.ping()
-            binance_status = "✅ Connected"
-        except:
-            binance_status = "❌ Connection failed"
-    
+def _set_or_missing(value):
+    return '✅ Set' if value else '❌ Missing'
+
+def _render_home(binance_status):
     return f"""
     <h1>🚀 TradingView to Binance Bot</h1>
     <p>✅ Bot is running successfully!</p>
@@ -63,9 +268,9 @@ def home():
     <p>💰 Risk per trade: <strong>{RISK_PERCENTAGE}%</strong> of USDT balance</p>
     <p>🔧 Environment variables:</p>
     <ul>
-        <li>BINANCE_API_KEY: {'✅ Set' if BINANCE_API_KEY else '❌ Missing'}</li>
-        <li>BINANCE_SECRET_KEY: {'✅ Set' if BINANCE_SECRET_KEY else '❌ Missing'}</li>
-        <li>WEBHOOK_SECRET: {'✅ Set' if WEBHOOK_SECRET else '❌ Missing'}</li>
+        <li>BINANCE_API_KEY: {_set_or_missing(BINANCE_API_KEY)}</li>
+        <li>BINANCE_SECRET_KEY: {_set_or_missing(BINANCE_SECRET_KEY)}</li>
+        <li>WEBHOOK_SECRET: {_set_or_missing(WEBHOOK_SECRET)}</li>
         <li>RISK_PERCENTAGE: {RISK_PERCENTAGE}%</li>
         <li>Binance Connection: {binance_status}</li>
     </ul>
@@ -74,221 +279,604 @@ def home():
         <li><a href="/test">/test</a> - Test webhook</li>
         <li><a href="/balance">/balance</a> - Check balance</li>
     </ul>
-    """
+    """.encode('utf-8')
+
+# Binance connection status labels; _HOME_HTML has a page for each
+STATUS_NOT_CONNECTED = "❌ Not connected"
+STATUS_CONNECTED = "✅ Connected"
+STATUS_CONNECTION_FAILED = "❌ Connection failed"
+
+# Everything on the page is fixed at startup except the connection status,
+# so render each possible variant once
+_HOME_HTML = {
+    status: _render_home(status)
+    for status in (STATUS_NOT_CONNECTED, STATUS_CONNECTED, STATUS_CONNECTION_FAILED)
+}
+
+# Binance connection status, refreshed in the background so page hits never ping
+BINANCE_STATUS_INTERVAL = 30  # seconds
+_binance_status = {'status': STATUS_CONNECTED if binance_client else STATUS_NOT_CONNECTED}
+
+def _refresh_binance_status():
+    """Ping Binance every BINANCE_STATUS_INTERVAL seconds and record the result"""
+    while True:
+        time.sleep(BINANCE_STATUS_INTERVAL)
+        try:
+            binance_call(WEIGHT_PING, binance_client.ping)
+            status = STATUS_CONNECTED
+        except Exception:
+            status = STATUS_CONNECTION_FAILED
+        _binance_status['status'] = status
+
+@app.route('/')
+def home():
+    response = Response(_HOME_HTML[_binance_status['status']], mimetype='text/html')
+    response.headers['Cache-Control'] = f'public, max-age={BINANCE_STATUS_INTERVAL}'
+    return response
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
+    # Reject oversized bodies before reading them
+    if (request.content_length or 0) > MAX_WEBHOOK_BYTES:
+        return _json({'error': 'Payload too large'}, 413)
+    
+    # Read the body once; JSON alerts start with '{', everything else is text
+    raw = request.get_data(cache=False)
+    if request.content_length is None and len(raw) >= MAX_WEBHOOK_BYTES:
+        return _json({'error': 'Payload too large'}, 413)  # Chunked body cut off at the cap
+    
     try:
-        # Try to get JSON data first
-        data = None
-        try:
-            data = request.get_json()
-        except:
-            pass
+        # Signed senders put HMAC-SHA256(WEBHOOK_SECRET, body) in X-Signature;
+        # check it before spending any time on parsing
+        signature = request.headers.get('X-Signature')
+        if signature is None and REQUIRE_WEBHOOK_SIGNATURE:
+            logger.warning("⚠️ Unsigned webhook rejected!")
+            return _json({'error': 'Missing signature'}, 401)
+        if signature is not None and not verify_signature(raw, signature):
+            logger.warning("⚠️ Invalid webhook signature!")
+            return _json({'error': 'Invalid signature'}, 401)
+        
+        # A shared secret in a header, the query string (?secret=...) or the
+        # start of a JSON body is checked before parsing as well
+        provided_secret = request.headers.get('X-Webhook-Secret') or request.args.get('secret')
+        if provided_secret is None:
+            match = _BODY_SECRET_RE.search(raw, 0, BODY_SECRET_PEEK_BYTES)
+            provided_secret = match.group(1) if match else None
+        if provided_secret is not None and not secret_matches(provided_secret):
+            logger.warning("⚠️ Invalid webhook secret!")
+            return _json({'error': 'Invalid secret'}, 401)
         
-        # If no JSON, try to parse text from TradingView
-        if not data:
-            text_data = request.get_data(as_text=True)
-            logger.info(f"Received text data: {text_data}")
-            data = parse_tradingview_text(text_data)
+        if raw.lstrip()[:1] != b'{' and len(raw) > MAX_TEXT_ALERT_BYTES:
+            return _json({'error': 'Text alert too large'}, 413)
+        
+        data = parse_webhook_body(raw)
         
         if not data:
-            return jsonify({'error': 'No valid data received'}), 400
+            return _json({'error': 'No valid data received'}, 400)
         
-        logger.info(f"Parsed webhook data: {data}")
+        logger.info("Parsed webhook data: %s", data)
         
         # Extract trading signal data
-        action = data.get('action') or data.get('side', '').lower()  # 'buy' or 'sell'
-        symbol = data.get('symbol', 'BTCUSDT')
+        action = str(data.get('action') or data.get('side') or '').lower()  # 'buy' or 'sell'
+        symbol = str(data.get('symbol') or 'BTCUSDT').upper()
         
         # Check webhook secret if provided
         webhook_secret = data.get('secret')
-        if webhook_secret and webhook_secret != WEBHOOK_SECRET:
+        if webhook_secret and not secret_matches(str(webhook_secret)):
             logger.warning("⚠️ Invalid webhook secret!")
-            return jsonify({'error': 'Invalid secret'}), 401
+            return _json({'error': 'Invalid secret'}, 401)
+        if REQUIRE_WEBHOOK_SECRET and provided_secret is None and not webhook_secret:
+            logger.warning("⚠️ Webhook without secret rejected!")
+            return _json({'error': 'Missing secret'}, 401)
         
         if not action:
-            return jsonify({'error': 'No action specified'}), 400
+            return _json({'error': 'No action specified'}, 400)
+        if action not in ('buy', 'sell'):
+            # Rejected here rather than by the worker, before it takes a queue slot
+            return _json({'error': f'Invalid action: {action}'}, 400)
         
-        # Execute trade if Binance client is configured
+        # Queue the trade if Binance client is configured
         if binance_client:
-            result = execute_trade_with_percentage(action, symbol)
-            return jsonify(result)
+            try:
+                job, duplicate = enqueue_trade(action, symbol, signal_key(data, action, symbol))
+            except queue.Full:
+                logger.warning("⚠️ Trade queue full, rejecting signal")
+                return _json({'error': 'Too many pending signals'}, 429)
+            if duplicate:
+                return _json({'status': 'duplicate', 'id': job['id'], 'result': job['result']})
+            return _json({'status': 'queued', 'id': job['id']})
         else:
-            logger.info(f"Would execute: {action} {symbol} ({RISK_PERCENTAGE}% of balance)")
-            return jsonify({
+            logger.info("Would execute: %s %s (%s%% of balance)", action, symbol, RISK_PERCENTAGE)
+            return _json({
                 'status': 'success',
                 'message': f'Signal received: {action} {symbol}',
                 'note': 'Binance API not configured - simulation mode'
             })
             
     except Exception as e:
-        logger.error(f"Webhook error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        logger.error("Webhook error: %s", e)
+        return _json({'error': str(e)}, 500)
+
+def parse_webhook_body(raw):
+    """Decode a webhook body: JSON if it starts with '{', else a TradingView text alert"""
+    if raw.lstrip()[:1] == b'{':
+        try:
+            data = orjson.loads(raw)
+            if isinstance(data, dict) and data:
+                return data
+        except orjson.JSONDecodeError:
+            pass
+    
+    # If no JSON, try to parse text from TradingView
+    text_data = raw.decode('utf-8', errors='replace')
+    logger.info("Received text data: %s", text_data)
+    return parse_tradingview_text(text_data)
+
+def secret_matches(value):
+    """Constant-time comparison of a provided secret (str or bytes) with WEBHOOK_SECRET"""
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return hmac.compare_digest(value, _WEBHOOK_KEY)
+
+def verify_signature(body, signature):
+    """Constant-time check of a hex HMAC-SHA256 signature over the raw body"""
+    mac = _SIGNATURE_MAC.copy()  # Skips re-deriving the keyed SHA-256 state
+    mac.update(body)
+    expected = mac.hexdigest()
+    return hmac.compare_digest(signature.strip().lower().encode('utf-8'), expected.encode('ascii'))
+
+# TradingView text alerts are a few whitespace-separated tokens:
+#   "BUY BTCUSDT QTY=0.0083" / "SELL BTCUSDT QTY=0.0083"
+#   "CLOSE LONG BTCUSDT" / "CLOSE SHORT BTCUSDT"
+# so they are classified by the first token instead of a regex. New formats
+# go in as further branches on that token.
+_CLOSE_ACTIONS = {'LONG': 'sell', 'SHORT': 'buy'}  # Close long = sell, close short = buy
+
+def _leading_symbol(token):
+    """The word characters a token starts with - 'BTCUSDT.' -> 'BTCUSDT'"""
+    for i, ch in enumerate(token):
+        if not (ch.isalnum() or ch == '_'):
+            return token[:i]
+    return token
+
+def _is_symbol_token(token):
+    return _leading_symbol(token) == token
+
+def _is_qty_token(token):
+    return len(token) > 4 and token[:4].upper() == 'QTY=' and token[4] in '0123456789.'
 
 def parse_tradingview_text(text):
     """Parse TradingView text alerts like 'BUY BTCUSDT QTY=0.0083'"""
     try:
-        # Remove extra whitespace
-        text = text.strip()
-        
-        # Pattern 1: "BUY BTCUSDT QTY=0.0083"
-        pattern1 = r'(BUY|SELL)\s+(\w+)\s+QTY=([0-9.]+)'
-        match1 = re.match(pattern1, text, re.IGNORECASE)
+        tokens = text.split()
+        op = tokens[0].upper() if tokens else ''
         
-        if match1:
-            action = match1.group(1).lower()
-            symbol = match1.group(2).upper()
+        if op in ('BUY', 'SELL') and len(tokens) >= 3 and _is_symbol_token(tokens[1]) and _is_qty_token(tokens[2]):
             # Ignore the quantity - we'll calculate it based on balance
             return {
-                'action': action,
-                'symbol': symbol,
+                'action': op.lower(),
+                'symbol': tokens[1].upper(),
                 'source': 'tradingview_text'
             }
         
-        # Pattern 2: "CLOSE LONG BTCUSDT" or "CLOSE SHORT BTCUSDT"
-        pattern2 = r'CLOSE\s+(LONG|SHORT)\s+(\w+)'
-        match2 = re.match(pattern2, text, re.IGNORECASE)
-        
-        if match2:
-            direction = match2.group(1).lower()
-            symbol = match2.group(2).upper()
-            # Convert to sell action
+        # Nothing has to follow the symbol here, so trailing punctuation is dropped
+        symbol = _leading_symbol(tokens[2]) if op == 'CLOSE' and len(tokens) >= 3 else ''
+        if symbol and tokens[1].upper() in _CLOSE_ACTIONS:
+            # Convert to the order that closes the position
             return {
-                'action': 'sell' if direction == 'long' else 'buy',  # Close long = sell, close short = buy
-                'symbol': symbol,
+                'action': _CLOSE_ACTIONS[tokens[1].upper()],
+                'symbol': symbol.upper(),
                 'source': 'tradingview_close'
             }
         
-        logger.warning(f"Could not parse TradingView text: {text}")
+        logger.warning("Could not parse TradingView text: %s", text.strip())
         return None
         
     except Exception as e:
-        logger.error(f"Error parsing TradingView text: {e}")
+        logger.error("Error parsing TradingView text: %s", e)
         return None
 
-def execute_trade_with_percentage(action, symbol):
+def get_symbol_meta(symbol):
+    """Return (step_size, min_notional, filters_by_type) for a symbol, cached per symbol"""
+    cached = _SYMBOL_META.get(symbol)
+    if cached and time.monotonic() - cached[3] < SYMBOL_META_TTL:
+        return cached[:3]
+    
+    symbol_info = binance_call(WEIGHT_EXCHANGE_INFO, binance_client.get_symbol_info, symbol)
+    if symbol_info is None:
+        raise ValueError(f'Unknown symbol: {symbol}')
+    return _cache_symbol_meta(symbol_info)[:3]
+
+def _cache_symbol_meta(symbol_info):
+    """Index a get_symbol_info/exchangeInfo entry's filters into _SYMBOL_META"""
+    filters = {f['filterType']: f for f in symbol_info['filters']}
+    lot_size = filters.get('LOT_SIZE')
+    step_size = Decimal(lot_size['stepSize']) if lot_size else DEFAULT_STEP_SIZE
+    
+    # Symbols carry the legacy MIN_NOTIONAL filter or its NOTIONAL successor;
+    # either may exempt market orders
+    min_notional = 0.0
+    for name, applies_flag in (('MIN_NOTIONAL', 'applyToMarket'), ('NOTIONAL', 'applyMinToMarket')):
+        f = filters.get(name)
+        if f and f.get(applies_flag, True):
+            min_notional = max(min_notional, float(f['minNotional']))
+    
+    meta = (step_size, min_notional, filters, time.monotonic())
+    _SYMBOL_META[symbol_info['symbol']] = meta
+    return meta
+
+def _on_user_event(msg):
+    """User-data stream callback: keep _BALANCES in sync with account updates"""
+    event = msg.get('e')
+    if event == 'outboundAccountPosition':
+        received_at = time.monotonic()
+        for b in msg['B']:
+            _BALANCES[b['a']] = (float(b['f']), float(b['l']), received_at)
+    elif event == 'error':
+        # Stream state is unknown now - fall back to REST and let the next
+        # get_free_balance restart the stream
+        logger.error("❌ User data stream error: %s", msg.get('m'))
+        _BALANCES.clear()
+        _twm.stop_socket(_STREAMS['user'])
+
+def get_free_balance(asset):
+    """Free balance for an asset from the stream cache, REST when missing or stale"""
+    _start_stream('user', lambda: _twm.start_user_socket(callback=_on_user_event))  # No-op unless it died
+    cached = _BALANCES.get(asset)
+    if cached is not None and time.monotonic() - cached[2] <= BALANCE_MAX_AGE:
+        return cached[0]
+    asset_balance = binance_call(WEIGHT_ACCOUNT, binance_client.get_asset_balance, asset=asset)
+    free, locked = (float(asset_balance['free']), float(asset_balance['locked'])) if asset_balance else (0.0, 0.0)
+    _BALANCES[asset] = (free, locked, time.monotonic())
+    return free
+
+def _start_stream(name, start):
+    """Run start() and record its stream path, unless `name` has a stream running or still shutting down"""
+    if _twm is None:
+        return
+    with _STREAMS_LOCK:
+        # python-binance keeps a path in _socket_running until its listener has
+        # exited; starting the same path before then lets the old listener
+        # delete the new one's entry on its way out
+        if name in _STREAMS and _STREAMS[name] in _twm._socket_running:
+            return
+        _STREAMS[name] = start()
+
+def _on_book_ticker(symbol, msg):
+    """bookTicker stream callback: record the best bid and ask with their arrival time"""
+    if msg.get('e') == 'error':
+        # The socket is gone - drop its quote and let the next get_price resubscribe
+        logger.error("❌ %s bookTicker stream error: %s", symbol, msg.get('m'))
+        _PRICES.pop(symbol, None)
+        _twm.stop_socket(_STREAMS[symbol])
+    elif 'b' in msg and 'a' in msg:
+        _PRICES[symbol] = (float(msg['b']), float(msg['a']), time.monotonic())
+
+def subscribe_ticker(symbol):
+    """Start a bookTicker stream for a symbol (no-op while one is running or shutting down)"""
+    _start_stream(symbol, lambda: _twm.start_symbol_book_ticker_socket(
+        callback=functools.partial(_on_book_ticker, symbol),
+        symbol=symbol
+    ))
+
+def get_price(symbol, action='buy'):
+    """Best ask for buys, best bid for sells - from the stream, REST when missing or stale"""
+    quote = _PRICES.get(symbol)
+    if quote is None or time.monotonic() - quote[2] > PRICE_MAX_AGE:
+        ticker = binance_call(WEIGHT_BOOK_TICKER, binance_client.get_orderbook_ticker, symbol=symbol)
+        quote = (float(ticker['bidPrice']), float(ticker['askPrice']), time.monotonic())
+        _PRICES[symbol] = quote
+        subscribe_ticker(symbol)
+    return quote[1] if action == 'buy' else quote[0]
+
+def start_streams():
+    """Subscribe to the user-data stream and seed balances with one REST call"""
+    global _twm
+    try:
+        _twm = ThreadedWebsocketManager(
+            api_key=binance_client.API_KEY,
+            api_secret=binance_client.API_SECRET
+        )
+        _twm.start()
+        _start_stream('user', lambda: _twm.start_user_socket(callback=_on_user_event))
+        
+        # Stream updates that arrived meanwhile are newer than the snapshot
+        account = binance_call(WEIGHT_ACCOUNT, binance_client.get_account)
+        received_at = time.monotonic()
+        for b in account['balances']:
+            _BALANCES.setdefault(b['asset'], (float(b['free']), float(b['locked']), received_at))
+        logger.info(f"✅ User data stream started, {len(_BALANCES)} balances cached")
+    except Exception as e:
+        logger.error(f"❌ Failed to start Binance streams: {e}")
+
+def refresh_symbol_assets():
+    """Rebuild the symbol -> (base, quote) map with one exchangeInfo call"""
+    global _SYMBOL_ASSETS, _symbol_assets_fetched_at
+    info = binance_call(WEIGHT_EXCHANGE_INFO, binance_client.get_exchange_info)
+    _SYMBOL_ASSETS = {s['symbol']: (s['baseAsset'], s['quoteAsset']) for s in info['symbols']}
+    _symbol_assets_fetched_at = time.monotonic()
+    logger.info(f"✅ Loaded base/quote assets for {len(_SYMBOL_ASSETS)} symbols")
+    return info
+
+def get_symbol_assets(symbol):
+    """Return (base_asset, quote_asset) for a symbol, e.g. BTCUSDT -> (BTC, USDT)"""
+    age = time.monotonic() - _symbol_assets_fetched_at
+    if age > SYMBOL_ASSETS_TTL or (symbol not in _SYMBOL_ASSETS and age > SYMBOL_ASSETS_RETRY):
+        refresh_symbol_assets()
+    assets = _SYMBOL_ASSETS.get(symbol)
+    if assets is None:
+        raise ValueError(f'Unknown symbol: {symbol}')
+    return assets
+
+def warm_caches():
+    """Prefill symbol info, assets and prices for WARM_SYMBOLS so the first trade is hot"""
+    try:
+        warm = set(WARM_SYMBOLS)
+        
+        # One exchangeInfo call covers the asset map and every warm symbol's filters
+        info = refresh_symbol_assets()
+        for symbol_info in info['symbols']:
+            if symbol_info['symbol'] in warm:
+                _cache_symbol_meta(symbol_info)
+        
+        # One call for all bid/ask quotes instead of a ticker request per symbol
+        received_at = time.monotonic()
+        for ticker in binance_call(WEIGHT_ALL_BOOK_TICKERS, binance_client.get_orderbook_tickers):
+            if ticker['symbol'] in warm:
+                _PRICES.setdefault(ticker['symbol'], (float(ticker['bidPrice']), float(ticker['askPrice']), received_at))
+        
+        for symbol in WARM_SYMBOLS:
+            subscribe_ticker(symbol)
+        logger.info(f"✅ Warmed caches for {', '.join(WARM_SYMBOLS)}")
+    except Exception as e:
+        logger.error(f"❌ Failed to warm caches: {e}")
+
+def quantize_quantity(quantity, step_size):
+    """Round a quantity down to a whole number of steps, as an order string"""
+    q = (Decimal(str(quantity)) // step_size) * step_size
+    return format(q.normalize(), 'f')
+
+def execute_trade_with_percentage(action, symbol, client_order_id=None):
     """Execute buy/sell order using percentage of USDT balance"""
+    action = action.lower()
+    symbol = symbol.upper()
+    if action not in ('buy', 'sell'):
+        return {'error': f'Invalid action: {action}'}
+    
     try:
-        # Get current USDT balance
-        usdt_balance = binance_client.get_asset_balance(asset='USDT')
-        available_usdt = float(usdt_balance['free'])
-        
-        logger.info(f"💰 Available USDT balance: {available_usdt}")
+        # USDT balance, price and lot size (plus the base-asset balance when
+        # selling) are independent, so any REST fallbacks run concurrently
+        lookups = [
+            lambda: get_free_balance('USDT'),
+            lambda: get_price(symbol, action),
+            lambda: get_symbol_meta(symbol),
+        ]
+        if action == 'sell':
+            asset, _ = get_symbol_assets(symbol)  # BTCUSDT -> BTC
+            lookups.append(lambda: get_free_balance(asset))
+        available_usdt, current_price, (step_size, min_notional, _), *asset_balances = _gather(lookups)
+        
+        logger.info("💰 Available USDT balance: %s", available_usdt)
         
         if available_usdt < MIN_USDT_BALANCE:
             return {'error': f'Insufficient USDT balance. Available: {available_usdt}, Minimum: {MIN_USDT_BALANCE}'}
         
         # Calculate trade amount (percentage of available balance)
-        usdt_to_trade = (available_usdt - MIN_USDT_BALANCE) * (RISK_PERCENTAGE / 100)
+        usdt_to_trade = (available_usdt - MIN_USDT_BALANCE) * _RISK_FRACTION
+        
+        logger.info("💵 USDT to trade (%s%%): $%.2f", RISK_PERCENTAGE, usdt_to_trade)
         
-        logger.info(f"💵 USDT to trade ({RISK_PERCENTAGE}%): ${usdt_to_trade:.2f}")
+        if usdt_to_trade < MIN_TRADE_USDT:
+            return {'error': f'Trade amount too small: ${usdt_to_trade:.2f}. Need at least ${MIN_TRADE_USDT:.0f}.'}
         
-        if usdt_to_trade < 10:  # Binance minimum is usually around $10
-            return {'error': f'Trade amount too small: ${usdt_to_trade:.2f}. Need at least $10.'}
+        logger.info("📈 Current %s price: $%s", symbol, current_price)
         
-        # Get current price
-        ticker = binance_client.get_symbol_ticker(symbol=symbol.upper())
-        current_price = float(ticker['price'])
-        logger.info(f"📈 Current {symbol} price: ${current_price}")
+        # Tags the order with the alert's key so it can be traced back to the signal.
+        # Binance only rejects a reused id while the first order is still open, and
+        # market orders fill at once, so this does not stop a retried alert
+        order_id_params = {'newClientOrderId': client_order_id} if client_order_id else {}
         
         # Calculate quantity to buy/sell
-        if action.lower() == 'buy':
+        if action == 'buy':
             quantity = usdt_to_trade / current_price
             
-            # Adjust quantity to match Binance's precision requirements
-            symbol_info = binance_client.get_symbol_info(symbol.upper())
-            step_size = None
-            for f in symbol_info['filters']:
-                if f['filterType'] == 'LOT_SIZE':
-                    step_size = float(f['stepSize'])
-                    break
+            # Adjust quantity to match Binance's LOT_SIZE step exactly
+            order_quantity = quantize_quantity(quantity, step_size)
+            quantity = float(order_quantity)
             
-            if step_size:
-                # Calculate precision based on step size
-                precision = len(str(step_size).split('.')[-1].rstrip('0')) if '.' in str(step_size) else 0
-                quantity = round(quantity, precision)
-            else:
-                quantity = round(quantity, 6)  # Default precision
+            # Reject locally what Binance's notional filter would reject
+            if quantity * current_price < min_notional:
+                return {'error': f'Order value ${quantity * current_price:.2f} is below the {symbol} minimum of ${min_notional}'}
             
-            logger.info(f"🚀 Executing BUY: {quantity} {symbol} for ~${usdt_to_trade:.2f}")
+            logger.info("🚀 Executing BUY: %s %s for ~$%.2f", order_quantity, symbol, usdt_to_trade)
             
             # Market buy order
-            order = binance_client.order_market_buy(
-                symbol=symbol.upper(),
-                quantity=quantity
+            _ORDER_LIMITER.acquire(1)
+            order = binance_call(
+                WEIGHT_ORDER,
+                binance_client.order_market_buy,
+                symbol=symbol,
+                quantity=order_quantity,
+                newOrderRespType=ORDER_RESP_TYPE,
+                **order_id_params
             )
-            logger.info(f"✅ BUY order executed: {order}")
+            logger.info("✅ BUY order executed: %s", order)
             
-        elif action.lower() == 'sell':
+        else:
             # For sell orders, we need to check how much of the asset we own
-            asset = symbol.replace('USDT', '')  # BTCUSDT -> BTC
-            asset_balance = binance_client.get_asset_balance(asset=asset)
-            available_asset = float(asset_balance['free'])
+            available_asset = asset_balances[0]
             
-            logger.info(f"💼 Available {asset} balance: {available_asset}")
+            logger.info("💼 Available %s balance: %s", asset, available_asset)
             
             if available_asset == 0:
                 return {'error': f'No {asset} balance to sell'}
             
-            # Sell all available amount or calculate percentage
-            quantity = available_asset
+            # Sell all available amount, rounded down to the LOT_SIZE step
+            order_quantity = quantize_quantity(available_asset, step_size)
+            quantity = float(order_quantity)
             
-            logger.info(f"📉 Executing SELL: {quantity} {symbol} for ~${quantity * current_price:.2f}")
+            if quantity == 0:
+                return {'error': f'{asset} balance {available_asset} is below the lot size {step_size}'}
+            
+            if quantity * current_price < min_notional:
+                return {'error': f'Order value ${quantity * current_price:.2f} is below the {symbol} minimum of ${min_notional}'}
+            
+            logger.info("📉 Executing SELL: %s %s for ~$%.2f", order_quantity, symbol, quantity * current_price)
             
             # Market sell order
-            order = binance_client.order_market_sell(
-                symbol=symbol.upper(),
-                quantity=quantity
+            _ORDER_LIMITER.acquire(1)
+            order = binance_call(
+                WEIGHT_ORDER,
+                binance_client.order_market_sell,
+                symbol=symbol,
+                quantity=order_quantity,
+                newOrderRespType=ORDER_RESP_TYPE,
+                **order_id_params
             )
-            logger.info(f"✅ SELL order executed: {order}")
-            
-        else:
-            return {'error': f'Invalid action: {action}'}
+            logger.info("✅ SELL order executed: %s", order)
+        
+        # An ACK response arrives before the fill reaches the user-data stream, so
+        # the next trade would read pre-order balances; make it ask REST instead
+        for traded_asset in get_symbol_assets(symbol):
+            _BALANCES.pop(traded_asset, None)
         
         return {
             'status': 'success',
             'action': action,
             'symbol': symbol,
             'quantity': quantity,
-            'usdt_amount': usdt_to_trade if action.lower() == 'buy' else quantity * current_price,
+            'usdt_amount': usdt_to_trade if action == 'buy' else quantity * current_price,
             'price': current_price,
             'order_id': order.get('orderId'),
             'message': f'✅ {action.upper()} order executed successfully!'
         }
         
     except BinanceAPIException as e:
-        logger.error(f"❌ Binance API error: {e}")
+        logger.error("❌ Binance API error: %s", e)
         return {'error': f'Binance API error: {str(e)}'}
     except Exception as e:
-        logger.error(f"❌ Trade execution error: {e}")
+        logger.error("❌ Trade execution error: %s", e)
         return {'error': f'Trade execution error: {str(e)}'}
 
+def _gather(calls):
+    """Run independent zero-argument lookups concurrently; results in call order"""
+    futures = [_LOOKUP_POOL.submit(call) for call in calls]
+    return [future.result() for future in futures]
+
+def signal_key(data, action, symbol):
+    """Idempotency key for one alert, or None if the payload carries nothing identifying it"""
+    # TradingView resends the same body on retries, so its alert id or bar
+    # timestamp tells a retry apart from a new signal
+    marker = data.get('alert_id') or data.get('bar_time') or data.get('time') or data.get('timenow')
+    if marker is None:
+        return None
+    # 32 hex chars - also valid as Binance's newClientOrderId
+    return hashlib.blake2b(f"{action}:{symbol}:{marker}".encode('utf-8'), digest_size=16).hexdigest()
+
+def enqueue_trade(action, symbol, key=None):
+    """Queue a signal for the trade worker; returns (job, is_duplicate)"""
+    with _SEEN_ALERTS_LOCK:
+        if key is not None:
+            job = _SEEN_ALERTS.get(key)
+            if job is not None:
+                _SEEN_ALERTS.move_to_end(key)
+                return job, True
+        
+        job = {'id': uuid.uuid4().hex, 'action': action, 'symbol': symbol, 'client_order_id': key, 'result': None}
+        _TRADE_QUEUE.put_nowait(job)  # raises queue.Full
+        
+        if key is not None:
+            _SEEN_ALERTS[key] = job
+            if len(_SEEN_ALERTS) > SEEN_ALERTS_SIZE:
+                _SEEN_ALERTS.popitem(last=False)
+        return job, False
+
+def _collect_batch():
+    """Wait for a signal, then split what arrives within the window into runs of identical signals"""
+    job = _TRADE_QUEUE.get()
+    runs = [[job]]
+    if _TRADE_QUEUE.empty():
+        return runs  # Nothing behind it - a lone signal trades without waiting
+    deadline = time.monotonic() + COALESCE_WINDOW
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            job = _TRADE_QUEUE.get(timeout=remaining)
+        except queue.Empty:
+            break
+        # Only back-to-back identical signals merge, so BUY, SELL, BUY stays three orders
+        last = runs[-1]
+        if (job['action'], job['symbol']) == (last[0]['action'], last[0]['symbol']):
+            last.append(job)
+            if len(last) >= COALESCE_MAX_SIGNALS:
+                break
+        else:
+            runs.append([job])
+    return runs
+
+def _trade_worker():
+    """Execute queued signals off the request thread, one order per run of identical signals"""
+    while True:
+        for jobs in _collect_batch():
+            action, symbol = jobs[0]['action'], jobs[0]['symbol']
+            job_ids = ', '.join(job['id'] for job in jobs)
+            client_order_id = next((job['client_order_id'] for job in jobs if job['client_order_id']), None)
+            try:
+                if len(jobs) > 1:
+                    logger.info("Coalesced %s %s signals into one order", len(jobs), action)
+                result = execute_trade_with_percentage(action, symbol, client_order_id)
+                logger.info("Job %s finished: %s", job_ids, result)
+            except Exception as e:
+                logger.error("❌ Job %s failed: %s", job_ids, e)
+                result = {'error': f'Trade execution error: {str(e)}'}
+            finally:
+                for job in jobs:
+                    job['result'] = result
+                    _TRADE_QUEUE.task_done()
+
 @app.route('/balance')
 def get_balance():
     """Get account balance from Binance"""
     if not binance_client:
-        return jsonify({'error': 'Binance API not configured'})
+        return _json({'error': 'Binance API not configured'})
     
     try:
-        account = binance_client.get_account()
-        balances = []
-        
-        for balance in account['balances']:
-            free_balance = float(balance['free'])
-            locked_balance = float(balance['locked'])
-            if free_balance > 0 or locked_balance > 0:
-                balances.append({
-                    'asset': balance['asset'],
-                    'free': balance['free'],
-                    'locked': balance['locked'],
-                    'total': free_balance + locked_balance
-                })
-        
-        # Sort by total balance (highest first)
-        balances.sort(key=lambda x: x['total'], reverse=True)
-        
-        return jsonify({
+        limit = int(request.args.get('limit', BALANCE_DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return _json({'error': 'limit must be a positive integer'}, 400)
+    limit = min(limit, BALANCE_MAX_LIMIT)
+    
+    try:
+        # Dashboards poll this in bursts - reuse a snapshot for a couple of seconds
+        now = time.monotonic()
+        if _account_snapshot['account'] is None or now - _account_snapshot['ts'] > ACCOUNT_SNAPSHOT_TTL:
+            _account_snapshot.update(account=binance_call(WEIGHT_ACCOUNT, binance_client.get_account), ts=now)
+        account = _account_snapshot['account']
+        
+        # Binance sends zero balances as the canonical string '0.00000000', so
+        # most of the list is dropped without parsing any floats
+        nonzero = (
+            (balance, float(balance['free']) + float(balance['locked']))
+            for balance in account['balances']
+            if balance['free'] != ZERO_BALANCE or balance['locked'] != ZERO_BALANCE
+        )
+        
+        # Largest totals first, keeping only the top `limit` rows
+        balances = [
+            {
+                'asset': balance['asset'],
+                'free': balance['free'],
+                'locked': balance['locked'],
+                'total': total
+            }
+            for balance, total in heapq.nlargest(limit, nonzero, key=lambda row: row[1])
+        ]
+        
+        return _json({
             'status': 'success',
             'balances': balances,
             'count': len(balances)
@@ -296,13 +884,10 @@ def get_balance():
         
     except Exception as e:
         logger.error(f"Balance error: {e}")
-        return jsonify({'error': str(e)})
+        return _json({'error': str(e)})
 
-@app.route('/test', methods=['GET', 'POST'])
-def test_webhook():
-    """Test endpoint"""
-    if request.method == 'GET':
-        return """
+# Static page, encoded once at import
+_TEST_HTML = """
         <h2>🧪 Test Webhook</h2>
         <p><strong>Supported formats:</strong></p>
         <ul>
@@ -315,22 +900,29 @@ def test_webhook():
         
         <h3>Quick Test:</h3>
         <p>POST to this endpoint with text: <code>BUY BTCUSDT QTY=0.001</code></p>
-        """
+        """.encode('utf-8')
+
+@app.route('/test', methods=['GET', 'POST'])
+def test_webhook():
+    """Test endpoint"""
+    if request.method == 'GET':
+        return Response(_TEST_HTML, mimetype='text/html')
     
     # Handle POST request - simulate webhook
     try:
-        # Try to get test data
-        test_data = request.get_json() or {
+        # Parse test data the same way as the webhook (JSON or text alert)
+        raw = request.get_data(cache=False)
+        test_data = (parse_webhook_body(raw) if raw.strip() else None) or {
             'action': 'buy',
             'symbol': 'BTCUSDT',
             'source': 'test'
         }
         
-        logger.info(f"🧪 Test webhook data: {test_data}")
+        logger.info("🧪 Test webhook data: %s", test_data)
         
         if binance_client:
             # Don't actually execute trades in test mode - just simulate
-            return jsonify({
+            return _json({
                 'status': 'test_success',
                 'message': f'✅ Would execute: {test_data.get("action", "buy").upper()} {test_data.get("symbol", "BTCUSDT")}',
                 'risk_percentage': f'{RISK_PERCENTAGE}%',
@@ -338,7 +930,7 @@ def test_webhook():
                 'note': '🧪 Test mode - no actual trades executed'
             })
         else:
-            return jsonify({
+            return _json({
                 'status': 'test_success',
                 'message': f'Would execute: {test_data.get("action", "buy").upper()} {test_data.get("symbol", "BTCUSDT")}',
                 'risk_percentage': f'{RISK_PERCENTAGE}%',
@@ -346,9 +938,16 @@ def test_webhook():
                 'note': '⚠️ Binance API not configured - simulation mode'
             })
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return _json({'error': str(e)})
+
+if binance_client:
+    start_streams()
+    threading.Thread(target=warm_caches, name='cache-warmer', daemon=True).start()
+    threading.Thread(target=_trade_worker, name='trade-worker', daemon=True).start()
+    threading.Thread(target=_refresh_binance_status, name='status-refresher', daemon=True).start()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 10000))
     logger.info(f"🚀 Starting bot on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False)
+    # Local runs only - production is served by gunicorn via wsgi.py (see Procfile)
+    app.run(host='0.0.0.0', port=port, debug=os.getenv('FLASK_ENV') == 'development')
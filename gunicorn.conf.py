@@ -0,0 +1,18 @@
+"""Gunicorn settings for the webhook bot (used by the Procfile: gunicorn -c gunicorn.conf.py wsgi:app)"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# A single gevent worker; concurrency comes from worker_connections greenlets.
+# Alert dedup, coalescing, the trade queue and the caches all live in the
+# worker process, so a second worker would let a TradingView retry that lands
+# on it place a second order. WEB_CONCURRENCY is deliberately not read - some
+# platforms set it to the CPU count on their own.
+worker_class = 'gevent'
+workers = 1
+worker_connections = 500
+
+backlog = 2048
+
+timeout = 30
+keepalive = 75
@@ -0,0 +1,639 @@
+"""Tester för webhook-boten (app.py): hjälpfunktioner och endpoints."""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import io
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+import orjson
+import pytest
+import requests
+from binance.exceptions import BinanceAPIException
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+# Utan API-nycklar startar importen varken Binance-klient, strömmar eller trådar
+os.environ.pop("BINANCE_API_KEY", None)
+os.environ.pop("BINANCE_SECRET_KEY", None)
+
+import app as bot  # noqa: E402
+
+# Regex-parsern som token-parsern ersatte - referens för vilka texter som accepteras
+_OLD_BUY_SELL = re.compile(r"(BUY|SELL)\s+(\w+)\s+QTY=([0-9.]+)", re.IGNORECASE)
+_OLD_CLOSE = re.compile(r"CLOSE\s+(LONG|SHORT)\s+(\w+)", re.IGNORECASE)
+
+
+def old_parse(text):
+    text = text.strip()
+    m = _OLD_BUY_SELL.match(text)
+    if m:
+        return {"action": m.group(1).lower(), "symbol": m.group(2).upper(), "source": "tradingview_text"}
+    m = _OLD_CLOSE.match(text)
+    if m:
+        action = "sell" if m.group(1).lower() == "long" else "buy"
+        return {"action": action, "symbol": m.group(2).upper(), "source": "tradingview_close"}
+    return None
+
+
+@pytest.mark.parametrize("text", [
+    "BUY BTCUSDT QTY=0.0083",
+    "SELL BTCUSDT QTY=0.0083",
+    "buy ethusdt qty=1",
+    "  BUY BTCUSDT QTY=.5\n",
+    "BUY\tBTCUSDT\tQTY=0.1",
+    "BUY BTC_USDT QTY=1",
+    "BUY BTCUSDT QTY=0.1 extra words",
+    "BUY BTCUSDT QTY=1abc",
+    "CLOSE LONG BTCUSDT",
+    "CLOSE SHORT BTCUSDT",
+    "close long btcusdt",
+    "CLOSE LONG BTCUSDT.",
+    "CLOSE SHORT BTC-USDT",
+    "CLOSE LONG BTCUSDT now",
+    "",
+    "   ",
+    "BUY BTCUSDT",
+    "BUY BTCUSDT QTY=",
+    "BUY BTCUSDT QTY=abc",
+    "BUY BTC/USDT QTY=1",
+    "BUY BTCUSDT QTY = 1",
+    "BUYBTCUSDT QTY=1",
+    "HOLD BTCUSDT QTY=1",
+    "alert: BUY BTCUSDT QTY=1",
+    "CLOSE BTCUSDT",
+    "CLOSE LONG",
+    "CLOSE FLAT BTCUSDT",
+    "CLOSE LONG -BTC",
+])
+def test_parse_tradingview_text_matches_old_regex(text):
+    assert bot.parse_tradingview_text(text) == old_parse(text)
+
+
+def test_parse_tradingview_text_close_maps_to_opposite_order():
+    assert bot.parse_tradingview_text("CLOSE LONG BTCUSDT")["action"] == "sell"
+    assert bot.parse_tradingview_text("CLOSE SHORT BTCUSDT")["action"] == "buy"
+
+
+@pytest.mark.parametrize("quantity, step, expected", [
+    (0.123456789, "0.001", "0.123"),
+    (0.0123456, "0.00001000", "0.01234"),   # Binance skickar steg med nollor på slutet
+    (1.6, "0.25", "1.5"),
+    (3.99, "1.00000000", "3"),
+    (0.3, "0.1", "0.3"),                    # float-division hade gett 2.999... steg
+    (0.29999999, "0.1", "0.2"),             # avrundar alltid nedåt
+    (0.0004, "0.001", "0"),
+])
+def test_quantize_quantity(quantity, step, expected):
+    assert bot.quantize_quantity(quantity, Decimal(step)) == expected
+
+
+def test_signal_key_needs_a_marker():
+    assert bot.signal_key({"action": "buy"}, "buy", "BTCUSDT") is None
+
+
+def test_signal_key_is_stable_and_a_valid_client_order_id():
+    key = bot.signal_key({"alert_id": 7}, "buy", "BTCUSDT")
+    assert key == bot.signal_key({"alert_id": 7, "secret": "x"}, "buy", "BTCUSDT")
+    assert re.fullmatch(r"[0-9a-f]{32}", key)   # ryms i Binance newClientOrderId (max 36)
+    assert key != bot.signal_key({"alert_id": 8}, "buy", "BTCUSDT")
+    assert key != bot.signal_key({"alert_id": 7}, "sell", "BTCUSDT")
+    assert key != bot.signal_key({"alert_id": 7}, "buy", "ETHUSDT")
+
+
+def test_signal_key_prefers_alert_id_over_time():
+    with_both = bot.signal_key({"alert_id": 7, "time": "2024-01-01"}, "buy", "BTCUSDT")
+    assert with_both == bot.signal_key({"alert_id": 7}, "buy", "BTCUSDT")
+
+
+class FakeClient:
+    """Binance-klient för tester: varje metod svarar från `responses` och räknar anropen."""
+
+    def __init__(self, **responses):
+        self.responses = responses
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name not in self.responses:
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            self.calls.append((name, kwargs))
+            response = self.responses[name]
+            return response(**kwargs) if callable(response) else response
+        return method
+
+
+class FakeSocketManager:
+    """Efterliknar ThreadedWebsocketManager: en stream ligger i _socket_running tills lyssnaren avslutat."""
+
+    def __init__(self, delay=0.0):
+        self._socket_running = {}
+        self.started = []
+        self.delay = delay
+
+    def _start(self, path):
+        time.sleep(self.delay)   # python-binance väntar på sin socket manager här
+        self._socket_running[path] = True
+        self.started.append(path)
+        return path
+
+    def start_user_socket(self, callback):
+        return self._start(None)   # python-binance ger user-streamen sökvägen None
+
+    def start_symbol_book_ticker_socket(self, callback, symbol):
+        return self._start(symbol.lower() + "@bookTicker")
+
+    def stop_socket(self, path):
+        self._socket_running[path] = False
+
+    def listener_exited(self, path):
+        del self._socket_running[path]
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    twm = FakeSocketManager()
+    monkeypatch.setattr(bot, "_twm", twm)
+    monkeypatch.setattr(bot, "_STREAMS", {})
+    monkeypatch.setattr(bot, "_BALANCES", {})
+    monkeypatch.setattr(bot, "_PRICES", {})
+    return twm
+
+
+def test_get_free_balance_serves_fresh_stream_balance(monkeypatch, streams):
+    client = FakeClient()
+    monkeypatch.setattr(bot, "binance_client", client)
+    bot._on_user_event({"e": "outboundAccountPosition", "B": [{"a": "USDT", "f": "150.5", "l": "0"}]})
+    assert bot.get_free_balance("USDT") == 150.5
+    assert client.calls == []
+
+
+def test_get_free_balance_refetches_stale_balance(monkeypatch, streams):
+    client = FakeClient(get_asset_balance={"asset": "USDT", "free": "90.0", "locked": "1.0"})
+    monkeypatch.setattr(bot, "binance_client", client)
+    bot._BALANCES["USDT"] = (150.5, 0.0, time.monotonic() - bot.BALANCE_MAX_AGE - 1)
+    assert bot.get_free_balance("USDT") == 90.0
+    assert bot._BALANCES["USDT"][:2] == (90.0, 1.0)
+    assert bot.get_free_balance("USDT") == 90.0   # färskt igen - ingen ny REST-fråga
+    assert len(client.calls) == 1
+
+
+def test_user_stream_error_clears_balances_and_restarts_after_listener_exits(monkeypatch, streams):
+    monkeypatch.setattr(bot, "binance_client", FakeClient(get_asset_balance=None))
+    bot._start_stream("user", lambda: streams.start_user_socket(callback=bot._on_user_event))
+    bot._on_user_event({"e": "outboundAccountPosition", "B": [{"a": "BTC", "f": "1", "l": "0"}]})
+
+    bot._on_user_event({"e": "error", "m": "Max reconnect retries reached"})
+    assert bot._BALANCES == {}
+    assert streams._socket_running[None] is False
+
+    # Den gamla lyssnaren lever kvar - ingen ny stream på samma sökväg än
+    assert bot.get_free_balance("BTC") == 0.0
+    assert streams.started == [None]
+
+    streams.listener_exited(None)
+    bot.get_free_balance("BTC")
+    assert streams.started == [None, None]
+    assert streams._socket_running[None] is True
+
+
+def _ticker(bid, ask):
+    return lambda symbol: {"symbol": symbol, "bidPrice": bid, "askPrice": ask}
+
+
+def test_get_price_serves_fresh_stream_quote(monkeypatch, streams):
+    client = FakeClient()
+    monkeypatch.setattr(bot, "binance_client", client)
+    bot._on_book_ticker("BTCUSDT", {"s": "BTCUSDT", "b": "100.0", "a": "101.0"})
+    assert bot.get_price("BTCUSDT", "buy") == 101.0    # köp mot ask
+    assert bot.get_price("BTCUSDT", "sell") == 100.0   # sälj mot bid
+    assert client.calls == []
+
+
+def test_get_price_refetches_stale_quote_and_subscribes(monkeypatch, streams):
+    client = FakeClient(get_orderbook_ticker=_ticker("200.0", "201.0"))
+    monkeypatch.setattr(bot, "binance_client", client)
+    bot._PRICES["BTCUSDT"] = (100.0, 101.0, time.monotonic() - bot.PRICE_MAX_AGE - 1)
+    assert bot.get_price("BTCUSDT", "buy") == 201.0
+    assert bot.get_price("BTCUSDT", "buy") == 201.0   # REST-svaret cachas
+    assert len(client.calls) == 1
+    assert streams.started == ["btcusdt@bookTicker"]
+
+
+def test_book_ticker_error_resubscribes_after_listener_exits(monkeypatch, streams):
+    monkeypatch.setattr(bot, "binance_client", FakeClient(get_orderbook_ticker=_ticker("200.0", "201.0")))
+    bot.subscribe_ticker("BTCUSDT")
+    path = bot._STREAMS["BTCUSDT"]
+    bot._on_book_ticker("BTCUSDT", {"s": "BTCUSDT", "b": "100.0", "a": "101.0"})
+
+    bot._on_book_ticker("BTCUSDT", {"e": "error", "m": "Max reconnect retries reached"})
+    assert "BTCUSDT" not in bot._PRICES
+    assert streams._socket_running[path] is False
+    assert bot.get_price("BTCUSDT") == 201.0
+    assert streams.started == [path]   # gamla lyssnaren avslutar fortfarande
+
+    streams.listener_exited(path)
+    bot.subscribe_ticker("BTCUSDT")
+    assert streams.started == [path, path]
+    assert streams._socket_running[path] is True
+
+
+def test_concurrent_subscribes_open_one_socket(monkeypatch):
+    twm = FakeSocketManager(delay=0.05)
+    monkeypatch.setattr(bot, "_twm", twm)
+    monkeypatch.setattr(bot, "_STREAMS", {})
+    threads = [threading.Thread(target=bot.subscribe_ticker, args=("ETHUSDT",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert twm.started == ["ethusdt@bookTicker"]
+
+
+def _symbol_info(*filters):
+    return {"symbol": "TESTUSDT", "filters": list(filters)}
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ([], 0.0),
+    ([{"filterType": "MIN_NOTIONAL", "minNotional": "10.0", "applyToMarket": True}], 10.0),
+    ([{"filterType": "MIN_NOTIONAL", "minNotional": "10.0", "applyToMarket": False}], 0.0),
+    ([{"filterType": "NOTIONAL", "minNotional": "5.0", "applyMinToMarket": True}], 5.0),
+    ([{"filterType": "NOTIONAL", "minNotional": "5.0", "applyMinToMarket": False}], 0.0),
+    ([{"filterType": "MIN_NOTIONAL", "minNotional": "10.0", "applyToMarket": True},
+      {"filterType": "NOTIONAL", "minNotional": "12.0", "applyMinToMarket": True}], 12.0),
+])
+def test_cache_symbol_meta_min_notional(monkeypatch, filters, expected):
+    monkeypatch.setattr(bot, "_SYMBOL_META", {})
+    step_size, min_notional, by_type, _ = bot._cache_symbol_meta(_symbol_info(*filters))
+    assert min_notional == expected
+    assert step_size == bot.DEFAULT_STEP_SIZE   # inget LOT_SIZE-filter
+    assert set(by_type) == {f["filterType"] for f in filters}
+    assert "TESTUSDT" in bot._SYMBOL_META
+
+
+def test_cache_symbol_meta_lot_size_step(monkeypatch):
+    monkeypatch.setattr(bot, "_SYMBOL_META", {})
+    info = _symbol_info({"filterType": "LOT_SIZE", "stepSize": "0.00100000"})
+    assert bot._cache_symbol_meta(info)[0] == Decimal("0.001")
+
+
+def _queue_jobs(monkeypatch, *signals, window=0.05):
+    q = queue.Queue()
+    for i, (action, symbol) in enumerate(signals):
+        q.put({"id": str(i), "action": action, "symbol": symbol, "client_order_id": None, "result": None})
+    monkeypatch.setattr(bot, "_TRADE_QUEUE", q)
+    monkeypatch.setattr(bot, "COALESCE_WINDOW", window)
+    return q
+
+
+def _runs(batch):
+    return [[job["id"] for job in jobs] for jobs in batch]
+
+
+def test_collect_batch_keeps_opposite_signals_in_order(monkeypatch):
+    _queue_jobs(monkeypatch, ("buy", "BTCUSDT"), ("sell", "BTCUSDT"), ("buy", "BTCUSDT"))
+    batch = bot._collect_batch()
+    assert _runs(batch) == [["0"], ["1"], ["2"]]
+    assert [jobs[0]["action"] for jobs in batch] == ["buy", "sell", "buy"]
+
+
+def test_collect_batch_merges_only_consecutive_identical_signals(monkeypatch):
+    _queue_jobs(monkeypatch, ("buy", "BTCUSDT"), ("buy", "BTCUSDT"), ("buy", "ETHUSDT"),
+                ("buy", "BTCUSDT"), ("sell", "BTCUSDT"), ("sell", "BTCUSDT"))
+    assert _runs(bot._collect_batch()) == [["0", "1"], ["2"], ["3"], ["4", "5"]]
+
+
+def test_collect_batch_flushes_at_max_signals(monkeypatch):
+    q = _queue_jobs(monkeypatch, *[("buy", "BTCUSDT")] * (bot.COALESCE_MAX_SIGNALS + 2))
+    assert _runs(bot._collect_batch()) == [[str(i) for i in range(bot.COALESCE_MAX_SIGNALS)]]
+    assert q.qsize() == 2
+
+
+def test_collect_batch_does_not_wait_for_a_lone_signal(monkeypatch):
+    _queue_jobs(monkeypatch, ("buy", "BTCUSDT"), window=5.0)
+    started = time.monotonic()
+    assert _runs(bot._collect_batch()) == [["0"]]
+    assert time.monotonic() - started < 1.0
+
+
+def test_weight_limiter_syncs_to_reported_weight():
+    limiter = bot.WeightLimiter(6000, 60)
+    limiter.sync_used(5990)
+    assert limiter.tokens == pytest.approx(10, abs=1)
+
+
+def test_weight_limiter_pause_blocks_acquire():
+    limiter = bot.WeightLimiter(10, 1)
+    limiter.pause(0.2)
+    started = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - started >= 0.2
+
+
+def _rate_limited(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = b'{"code": -1003, "msg": "Too many requests"}'
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+
+    def call():
+        raise BinanceAPIException(response, status, response.text)
+    return call
+
+
+@pytest.mark.parametrize("status, retry_after, expected", [
+    (429, "7", 7),
+    (418, "120", 120),
+    (429, None, bot.RATE_LIMIT_BACKOFF),
+])
+def test_binance_call_pauses_for_retry_after(monkeypatch, status, retry_after, expected):
+    limiter = bot.WeightLimiter(6000, 60)
+    monkeypatch.setattr(bot, "_WEIGHT_LIMITER", limiter)
+    with pytest.raises(BinanceAPIException):
+        bot.binance_call(1, _rate_limited(status, retry_after))
+    assert limiter.resume_at - time.monotonic() == pytest.approx(expected, abs=1)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(bot, "binance_client", None)   # simuleringsläge - inga riktiga order
+    return bot.app.test_client()
+
+
+def _sign(body):
+    return hmac.new(bot.WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _not_parsed(raw):
+    raise AssertionError("body parsed before the secret check")
+
+
+BUY = b'{"action": "buy", "symbol": "BTCUSDT"}'
+
+
+def test_webhook_accepts_valid_signature(client):
+    assert client.post("/webhook", data=BUY, headers={"X-Signature": _sign(BUY)}).status_code == 200
+
+
+def test_webhook_rejects_bad_signature(client):
+    resp = client.post("/webhook", data=BUY, headers={"X-Signature": _sign(BUY + b" ")})
+    assert resp.status_code == 401
+    assert resp.get_json() == {"error": "Invalid signature"}
+
+
+def test_webhook_requires_signature_when_configured(client, monkeypatch):
+    monkeypatch.setattr(bot, "REQUIRE_WEBHOOK_SIGNATURE", True)
+    assert client.post("/webhook", data=BUY).get_json() == {"error": "Missing signature"}
+    assert client.post("/webhook", data=BUY, headers={"X-Signature": _sign(BUY)}).status_code == 200
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"headers": {"X-Webhook-Secret": "wrong"}},
+    {"query_string": {"secret": "wrong"}},
+    {"data": b'{"secret": "wrong", "action": "buy"}'},   # hittas av förkontrollen
+])
+def test_webhook_rejects_wrong_secret_before_parsing(client, monkeypatch, kwargs):
+    monkeypatch.setattr(bot, "parse_webhook_body", _not_parsed)
+    kwargs.setdefault("data", BUY)
+    resp = client.post("/webhook", **kwargs)
+    assert resp.status_code == 401
+    assert resp.get_json() == {"error": "Invalid secret"}
+
+
+def test_webhook_rejects_wrong_escaped_body_secret_after_parsing(client):
+    # Escape-tecken gör att förkontrollen släpper igenom - den fulla tolkningen fångar det
+    resp = client.post("/webhook", data=b'{"action": "buy", "secret": "wr\\u006fng"}')
+    assert resp.status_code == 401
+
+
+def test_webhook_accepts_right_secret(client):
+    assert client.post("/webhook", data=BUY, headers={"X-Webhook-Secret": bot.WEBHOOK_SECRET}).status_code == 200
+    assert client.post("/webhook", data=b"BUY BTCUSDT QTY=1", query_string={"secret": bot.WEBHOOK_SECRET}).status_code == 200
+
+
+def test_webhook_requires_secret_when_configured(client, monkeypatch):
+    monkeypatch.setattr(bot, "REQUIRE_WEBHOOK_SECRET", True)
+    assert client.post("/webhook", data=BUY).get_json() == {"error": "Missing secret"}
+    assert client.post("/webhook", data=b"BUY BTCUSDT QTY=1").status_code == 401
+    body = b'{"action": "buy", "secret": "%s"}' % bot.WEBHOOK_SECRET.encode()
+    assert client.post("/webhook", data=body).status_code == 200
+
+
+def _chunked(body):
+    # Som gunicorn vid chunked upload: ingen Content-Length, servern avslutar strömmen
+    environ = EnvironBuilder(path="/webhook", method="POST", input_stream=io.BytesIO(body)).get_environ()
+    del environ["CONTENT_LENGTH"]
+    environ["HTTP_TRANSFER_ENCODING"] = "chunked"
+    environ["wsgi.input_terminated"] = True
+    app_iter, status, _ = run_wsgi_app(bot.app, environ)
+    return status, b"".join(app_iter)
+
+
+def test_webhook_rejects_large_content_length(client):
+    resp = client.post("/webhook", data=b"{" + b" " * bot.MAX_WEBHOOK_BYTES + b"}")
+    assert resp.status_code == 413
+
+
+def test_webhook_rejects_chunked_body_cut_off_at_the_cap(client):
+    status, body = _chunked(b'{"action": "buy"' + b" " * bot.MAX_WEBHOOK_BYTES + b"}")
+    assert status.startswith("413")
+    assert orjson.loads(body) == {"error": "Payload too large"}
+
+
+def test_webhook_accepts_small_chunked_body(client):
+    status, _ = _chunked(BUY)
+    assert status.startswith("200")
+
+
+def test_webhook_caps_text_alerts(client):
+    text = b"BUY BTCUSDT QTY=1 "
+    assert client.post("/webhook", data=text.ljust(bot.MAX_TEXT_ALERT_BYTES)).status_code == 200
+    resp = client.post("/webhook", data=text.ljust(bot.MAX_TEXT_ALERT_BYTES + 1))
+    assert resp.status_code == 413
+    assert resp.get_json() == {"error": "Text alert too large"}
+    # JSON-larm får vara större än textgränsen
+    assert client.post("/webhook", data=BUY[:-1] + b" " * 1000 + b"}").status_code == 200
+
+
+@pytest.fixture
+def live(monkeypatch):
+    """Webhooken med en konfigurerad klient men utan trade-worker: jobben blir kvar i kön."""
+    q = queue.Queue(maxsize=2)
+    monkeypatch.setattr(bot, "binance_client", FakeClient())
+    monkeypatch.setattr(bot, "_TRADE_QUEUE", q)
+    monkeypatch.setattr(bot, "_SEEN_ALERTS", OrderedDict())
+    return q
+
+
+@pytest.mark.parametrize("action", ['"hodl"', "1", '["buy"]'])
+def test_webhook_rejects_unknown_action_before_queueing(live, action):
+    resp = bot.app.test_client().post("/webhook", data=b'{"action": %s}' % action.encode())
+    assert resp.status_code == 400
+    assert resp.get_json()["error"].startswith("Invalid action")
+    assert live.empty()
+
+
+def test_webhook_queues_and_answers_retries_from_the_first_job(live):
+    client = bot.app.test_client()
+    body = b'{"action": "buy", "symbol": "BTCUSDT", "alert_id": 7}'
+    first = client.post("/webhook", data=body).get_json()
+    assert first["status"] == "queued"
+    retry = client.post("/webhook", data=body).get_json()
+    assert retry == {"status": "duplicate", "id": first["id"], "result": None}
+    assert live.qsize() == 1
+
+    job = live.get_nowait()
+    assert job["client_order_id"] == bot.signal_key({"alert_id": 7}, "buy", "BTCUSDT")
+    job["result"] = {"status": "success"}
+    assert client.post("/webhook", data=body).get_json()["result"] == {"status": "success"}
+
+
+def test_webhook_without_marker_is_never_deduplicated(live):
+    client = bot.app.test_client()
+    assert client.post("/webhook", data=BUY).get_json()["status"] == "queued"
+    assert client.post("/webhook", data=BUY).get_json()["status"] == "queued"
+    assert live.qsize() == 2
+
+
+def test_webhook_returns_429_when_queue_is_full(live):
+    client = bot.app.test_client()
+    for _ in range(live.maxsize):
+        client.post("/webhook", data=BUY)
+    resp = client.post("/webhook", data=b'{"action": "sell", "alert_id": 9}')
+    assert resp.status_code == 429
+    assert bot._SEEN_ALERTS == {}   # ett avvisat larm räknas inte som sett - omförsöket får köas
+
+
+def test_seen_alerts_is_a_bounded_lru(live, monkeypatch):
+    monkeypatch.setattr(bot, "SEEN_ALERTS_SIZE", 2)
+    monkeypatch.setattr(bot, "_TRADE_QUEUE", queue.Queue())
+    a, _ = bot.enqueue_trade("buy", "BTCUSDT", "a")
+    bot.enqueue_trade("buy", "BTCUSDT", "b")
+    assert bot.enqueue_trade("buy", "BTCUSDT", "a") == (a, True)   # a blir senast använd
+    bot.enqueue_trade("buy", "BTCUSDT", "c")
+    assert list(bot._SEEN_ALERTS) == ["a", "c"]
+
+
+def _balance(balances):
+    return lambda asset: {"asset": asset, "free": balances[asset], "locked": "0"}
+
+
+def test_orders_drop_cached_balances_so_the_next_trade_reads_rest(monkeypatch, streams):
+    rest_balances = {"USDT": "1000.0", "BTC": "0"}
+
+    def buy(**kwargs):
+        rest_balances["BTC"] = "0.5"   # fyllningen syns direkt över REST, inte i streamen
+        return {"orderId": 1}
+
+    client = FakeClient(get_asset_balance=_balance(rest_balances), order_market_buy=buy,
+                        order_market_sell={"orderId": 2})
+    monkeypatch.setattr(bot, "binance_client", client)
+    monkeypatch.setattr(bot, "_SYMBOL_META", {})
+    monkeypatch.setattr(bot, "_SYMBOL_ASSETS", {"BTCUSDT": ("BTC", "USDT")})
+    monkeypatch.setattr(bot, "_symbol_assets_fetched_at", time.monotonic())
+    bot._cache_symbol_meta({"symbol": "BTCUSDT", "filters": [{"filterType": "LOT_SIZE", "stepSize": "0.00001"}]})
+    bot._on_book_ticker("BTCUSDT", {"s": "BTCUSDT", "b": "100.0", "a": "100.0"})
+    bot._on_user_event({"e": "outboundAccountPosition", "B": [
+        {"a": "USDT", "f": "1000.0", "l": "0"}, {"a": "BTC", "f": "0", "l": "0"},
+    ]})
+
+    assert bot.execute_trade_with_percentage("buy", "BTCUSDT")["status"] == "success"
+    assert "BTC" not in bot._BALANCES and "USDT" not in bot._BALANCES
+
+    result = bot.execute_trade_with_percentage("sell", "BTCUSDT")
+    assert result["status"] == "success"
+    assert client.calls[-1] == ("order_market_sell", {
+        "symbol": "BTCUSDT", "quantity": "0.5", "newOrderRespType": bot.ORDER_RESP_TYPE,
+    })
+
+
+@pytest.mark.parametrize("status", [bot.STATUS_NOT_CONNECTED, bot.STATUS_CONNECTED, bot.STATUS_CONNECTION_FAILED])
+def test_home_has_a_page_for_every_status(client, monkeypatch, status):
+    monkeypatch.setitem(bot._binance_status, "status", status)
+    resp = client.get("/")
+    assert resp.status_code == 200
+    assert status in resp.get_data(as_text=True)
+
+
+_JSON_SAMPLE = {
+    "b": 1,
+    "a": [datetime(2024, 1, 2, 3, 4, 5), date(2024, 1, 2)],
+    "d": Decimal("1.5"),
+    "c": {"z": "å", "y": None},
+}
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"indent": 2}, {"sort_keys": False}])
+def test_orjson_provider_matches_flask_default(kwargs):
+    reference = DefaultJSONProvider(bot.app).dumps(_JSON_SAMPLE, ensure_ascii=False, **kwargs)
+    ours = bot.app.json.dumps(_JSON_SAMPLE, **kwargs)
+    assert orjson.loads(ours) == orjson.loads(reference)
+    assert list(orjson.loads(ours)) == list(orjson.loads(reference))   # samma nyckelordning
+    if kwargs.get("indent"):
+        assert ours == reference   # indenterat är byte för byte lika
+
+
+def test_orjson_provider_formats_dates_like_flask():
+    assert bot.app.json.dumps({"t": datetime(2024, 1, 2, 3, 4, 5)}) == '{"t":"Tue, 02 Jan 2024 03:04:05 GMT"}'
+
+
+def test_orjson_provider_loads():
+    assert bot.app.json.loads(b'{"a": [1, 2.5, null]}') == {"a": [1, 2.5, None]}
+
+
+def _account(*totals):
+    balances = [{"asset": "ZERO", "free": bot.ZERO_BALANCE, "locked": bot.ZERO_BALANCE}]
+    balances += [{"asset": f"A{i}", "free": f"{total:.8f}", "locked": bot.ZERO_BALANCE} for i, total in enumerate(totals)]
+    return {"balances": balances}
+
+
+@pytest.fixture
+def account(monkeypatch):
+    client = FakeClient(get_account=_account(5.0, 50.0, 0.5, 20.0))
+    monkeypatch.setattr(bot, "binance_client", client)
+    monkeypatch.setattr(bot, "_account_snapshot", {"account": None, "ts": 0.0})
+    return client
+
+
+def test_balance_lists_largest_nonzero_balances_first(account):
+    body = bot.app.test_client().get("/balance").get_json()
+    assert [b["asset"] for b in body["balances"]] == ["A1", "A3", "A0", "A2"]
+    assert body["count"] == 4
+
+
+def test_balance_limit(account):
+    body = bot.app.test_client().get("/balance?limit=2").get_json()
+    assert [b["asset"] for b in body["balances"]] == ["A1", "A3"]
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "x", "1.5", ""])
+def test_balance_rejects_invalid_limit(account, limit):
+    resp = bot.app.test_client().get(f"/balance?limit={limit}")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "limit must be a positive integer"}
+    assert account.calls == []
+
+
+def test_balance_clamps_limit(account, monkeypatch):
+    monkeypatch.setattr(bot, "BALANCE_MAX_LIMIT", 3)
+    assert bot.app.test_client().get("/balance?limit=1000").get_json()["count"] == 3
+
+
+def test_balance_reuses_account_snapshot(account, monkeypatch):
+    client = bot.app.test_client()
+    client.get("/balance")
+    client.get("/balance?limit=1")
+    assert len(account.calls) == 1
+    monkeypatch.setitem(bot._account_snapshot, "ts", time.monotonic() - bot.ACCOUNT_SNAPSHOT_TTL - 1)
+    client.get("/balance")
+    assert len(account.calls) == 2
@@ -0,0 +1,16 @@
+"""WSGI entrypoint (gunicorn or standalone): patch blocking I/O for gevent before the app is imported"""
+from gevent import monkey
+monkey.patch_all()
+
+import os  # noqa: E402
+
+from app import app, logger  # noqa: E402
+
+if __name__ == '__main__':
+    # Standalone production server without gunicorn: each request runs in its
+    # own greenlet, so webhooks waiting on Binance share one event loop
+    from gevent.pywsgi import WSGIServer
+
+    port = int(os.environ.get('PORT', 10000))
+    logger.info(f"🚀 Starting bot on port {port} (gevent)")
+    WSGIServer(('0.0.0.0', port), app).serve_forever()